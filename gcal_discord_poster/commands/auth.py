@@ -41,6 +41,10 @@ def register_parser(config: dict, parser):
         prog="gcal_discord_poster.py auth",
         description="Authenticates with Google so the program can get access "
                     "to the user's calendar.")
+    subparser.add_argument(
+        "-a", "--account", dest="account", default=conf.DEFAULT_ACCOUNT,
+        help="A name for the Google account to authenticate. Authenticating "
+             "several accounts spreads calendar requests across them.")
 
     return subparser
 
@@ -48,11 +52,19 @@ def register_parser(config: dict, parser):
 def run(config: dict, args: argparse.Namespace):
     """Runs the auth command with the provided arguments."""
 
-    credentials = conf.get_saved_google_credentials(config)
+    account = args.account
+
+    credentials = conf.get_saved_google_credentials(config, account)
     if not credentials:
-        LOG.info("CLI is not authenticated, starting OAuth2 flow.")
-        conf.get_new_google_credentials(config, args.client_id_file)
+        LOG.info(
+            "Account '%s' is not authenticated, starting OAuth2 flow.",
+            account)
+        conf.get_new_google_credentials(config, args.client_id_file, account)
     else:
-        LOG.info("CLI is already authenticated.")
+        LOG.info("Account '%s' is already authenticated.", account)
+        conf.save_config(config)
+
+    accounts = sorted(conf.get_google_accounts(config).keys())
+    LOG.info("Authenticated accounts: %s", ", ".join(accounts))
 
     return commands.EXIT_SUCCESS
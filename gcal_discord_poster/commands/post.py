@@ -24,7 +24,9 @@
 
 import argparse
 import datetime
+import json
 import logging
+from typing import Optional
 
 import gcal_discord_poster.commands as commands
 
@@ -32,9 +34,12 @@ import inflection
 
 from bs4 import BeautifulSoup
 from discord_webhook import DiscordWebhook, DiscordEmbed
+from google.auth.exceptions import RefreshError
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
 import gcal_discord_poster.utils.conf as conf
+import gcal_discord_poster.utils.quota as quota
 
 COMMAND = "post"
 
@@ -47,6 +52,9 @@ CHOICE_NO = 1
 CHOICE_ABORT = 2
 CHOICE_RETRY = 3
 
+# Error reasons Google returns when an account is making requests too fast.
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
 LOG = logging.getLogger("gcal-discord-poster")
 
 
@@ -201,6 +209,71 @@ def google_parse_datetime(dt: str) -> datetime.datetime:
     return datetime.datetime.strptime(dt, "%Y-%m-%dT%H:%M:%S%z")
 
 
+def is_rate_limit_error(error: HttpError) -> bool:
+    """Checks if a Google API error was caused by the account's rate limit."""
+
+    if error.resp.status == 429:
+        return True
+    if error.resp.status != 403:
+        return False
+
+    try:
+        content = json.loads(error.content.decode("utf-8"))
+    except ValueError:
+        return False
+
+    if not isinstance(content, dict):
+        return False
+
+    # OAuth errors use a plain string for "error" rather than an object.
+    content_error = content.get("error")
+    if not isinstance(content_error, dict):
+        return False
+
+    errors = content_error.get("errors", [])
+    return any(
+        isinstance(e, dict) and e.get("reason") in RATE_LIMIT_REASONS
+        for e in errors)
+
+
+def list_events(
+        pool: conf.GoogleCredentialPool,
+        accountant: quota.RequestAccountant,
+        calendar: str, **kwargs) -> Optional[dict]:
+    """Lists events on a calendar using an account from the credential pool.
+
+    If the account assigned to the calendar is rate limited or its
+    credentials can't be refreshed, the request is retried with the next
+    available account. None is returned if every account has been exhausted.
+    """
+
+    while True:
+        account = pool.assign(calendar)
+        if not account:
+            return None
+
+        credentials = pool.get_credentials(account)
+        if not credentials:
+            continue
+
+        service = build("calendar", "v3", credentials=credentials)
+        events_service = service.events()  # pylint: disable=no-member
+
+        try:
+            return accountant.execute(
+                calendar,
+                "events.list",
+                events_service.list(calendarId=calendar, **kwargs))
+        except RefreshError as error:
+            LOG.warning(
+                "Unable to refresh Google account '%s': %s", account, error)
+            pool.mark_broken(account)
+        except HttpError as error:
+            if not is_rate_limit_error(error):
+                raise
+            pool.mark_rate_limited(account)
+
+
 def register_parser(config: dict, parser):
     """Constructs a subparser for the post subcommand."""
 
@@ -220,6 +293,14 @@ def register_parser(config: dict, parser):
     subparser.add_argument(
         "-s", "--skip-days", dest="skip_days", type=int, default=0,
         help="The number of days to skip when seeking for events to post.")
+    subparser.add_argument(
+        "-b", "--daily-budget", dest="daily_budget", type=int,
+        help="The maximum number of Google API quota units to spend per day. "
+             "Polls are spaced out to stay within it. Pass 0 to remove a "
+             "previously set budget.")
+    subparser.add_argument(
+        "--ignore-budget", dest="ignore_budget", action="store_true",
+        help="Poll the calendar even if the daily budget says to wait.")
 
     return subparser
 
@@ -253,30 +334,59 @@ def run(config: dict, args: argparse.Namespace):
             LOG.error("No webhook url passed.")
             return commands.EXIT_GENERIC_ERROR
 
+    # Use the daily budget from the config if not specified in the args.
+    daily_budget = args.daily_budget
+    if daily_budget is None:
+        daily_budget = config.get("daily_budget")
+    if daily_budget is not None and daily_budget < 0:
+        LOG.error("Please specify a positive daily budget.")
+        return commands.EXIT_GENERIC_ERROR
+    if daily_budget == 0:
+        daily_budget = None
+
     # Stash the argument values in the config to save to the filesystem later.
     config["calendar"] = calendar
     config["webhook_url"] = webhook_url
+    config["daily_budget"] = daily_budget
 
-    credentials = conf.get_saved_google_credentials(config)
-    if not credentials:
+    pool = conf.GoogleCredentialPool(config)
+    if not pool.accounts():
         LOG.error(
             "Cannot read calendar as the CLI is not authenticated, aborting. "
             "Please run the 'auth' subcommand to authenticate the CLI.")
         return commands.EXIT_GENERIC_ERROR
 
-    service = build("calendar", "v3", credentials=credentials)
-    events_service = service.events()  # pylint: disable=no-member
+    accountant = quota.RequestAccountant(config, daily_budget)
+    if not accountant.should_poll(calendar) and not args.ignore_budget:
+        LOG.info(
+            "Skipping calendar to stay within the daily budget (%d units "
+            "left), it can be polled every %d seconds.",
+            accountant.remaining(), accountant.poll_interval(calendar))
+        conf.save_config(config)
+        return commands.EXIT_SUCCESS
 
     now = datetime.datetime.utcnow()
 
-    events_query = events_service.list(
-        calendarId=calendar,
-        timeMin=google_isoformat(now + datetime.timedelta(days=skip_days)),
-        timeMax=google_isoformat(now + datetime.timedelta(days=days)),
-        maxResults=50,
-        singleEvents=True,
-        orderBy="startTime")
-    events = events_query.execute()
+    # Stash the pool and accounting state even on failure so benched accounts
+    # stay benched and failed requests still count against the budget.
+    try:
+        events = list_events(
+            pool,
+            accountant,
+            calendar,
+            timeMin=google_isoformat(now + datetime.timedelta(days=skip_days)),
+            timeMax=google_isoformat(now + datetime.timedelta(days=days)),
+            maxResults=50,
+            singleEvents=True,
+            orderBy="startTime")
+    finally:
+        conf.save_config(config)
+
+    if events is None:
+        LOG.error(
+            "Cannot read calendar as no authenticated Google account is "
+            "currently usable, aborting.")
+        return commands.EXIT_GENERIC_ERROR
 
     approved_events = []
     event_items = events.get("items", [])
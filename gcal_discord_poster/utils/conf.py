@@ -22,10 +22,13 @@
 
 """Contains helper functions for retrieving configuration."""
 
+import datetime
 import json
 import logging
 import os
+import time
 
+from google.auth.exceptions import RefreshError
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -43,11 +46,19 @@ SCOPES = {
     "openid",
 }
 
+# Name of the account used when one isn't specified, and the account that
+# credentials saved by older versions of this tool are migrated to.
+DEFAULT_ACCOUNT = "default"
+
+# How long an account is avoided after Google reports it as rate limited.
+RATE_LIMIT_COOLDOWN = 15 * 60
+
 LOG = logging.getLogger("gcal-discord-poster")
 
 
 def get_new_google_credentials(
-        config: dict, client_id_path: str, save=True) -> Credentials:
+        config: dict, client_id_path: str, account=DEFAULT_ACCOUNT,
+        save=True) -> Credentials:
     """Obtains new Google access credentials via interactive OAuth2 flow."""
 
     flow = InstalledAppFlow.from_client_secrets_file(
@@ -61,16 +72,47 @@ def get_new_google_credentials(
         open_browser=True)
 
     if save:
-        stash_google_credentials(config, credentials)
+        stash_google_credentials(config, credentials, account)
         save_config(config)
 
     return credentials
 
 
-def get_saved_google_credentials(config: dict) -> Credentials:
+def get_google_accounts(config: dict) -> dict:
+    """Returns the saved Google accounts keyed by account name."""
+
+    return config.get("oauth", {}).get("google_accounts", {})
+
+
+def migrate_legacy_google_credentials(config: dict) -> dict:
+    """Moves credentials saved by older versions over to the default account.
+
+    Configs written before multiple accounts were supported store a single
+    set of credentials under "google". If the default account is already
+    taken, the legacy credentials are left in place so they aren't lost.
+    """
+
+    oauth = config.get("oauth", {})
+    if "google" not in oauth:
+        return config
+
+    accounts = oauth.setdefault("google_accounts", {})
+    if DEFAULT_ACCOUNT in accounts:
+        LOG.warning(
+            "Ignoring legacy Google credentials as the '%s' account already "
+            "exists. Remove the 'google' entry from the config to silence "
+            "this warning.", DEFAULT_ACCOUNT)
+    else:
+        accounts[DEFAULT_ACCOUNT] = oauth.pop("google")
+
+    return config
+
+
+def get_saved_google_credentials(
+        config: dict, account=DEFAULT_ACCOUNT) -> Credentials:
     """Returns saved Google access credentials stored in the config."""
 
-    credentials_dict = config.get("oauth", {}).get("google", {})
+    credentials_dict = get_google_accounts(config).get(account, {})
     if (
             not credentials_dict
             or "refresh_token" not in credentials_dict
@@ -79,32 +121,161 @@ def get_saved_google_credentials(config: dict) -> Credentials:
     ):
         return None
 
+    credentials_dict = dict(credentials_dict)
+    expiry = credentials_dict.pop("expiry", None)
+    if expiry:
+        credentials_dict["expiry"] = datetime.datetime.strptime(
+            expiry, "%Y-%m-%dT%H:%M:%S.%f")
+
     credentials = Credentials(**credentials_dict)
     if not credentials.valid:
         if credentials.expired and credentials.refresh_token:
             credentials.refresh(Request())
+            stash_google_credentials(config, credentials, account)
         else:
             return None
 
     return credentials
 
-def stash_google_credentials(config: dict, credentials: Credentials) -> dict:
-    """Stash Google OAuth2 credentials in a config dict."""
 
-    if "oauth" not in config:
-        config["oauth"] = {}
+def stash_google_credentials(
+        config: dict, credentials: Credentials,
+        account=DEFAULT_ACCOUNT) -> dict:
+    """Stash Google OAuth2 credentials in a config dict."""
 
-    config["oauth"]["google"] = {
+    oauth = config.setdefault("oauth", {})
+    oauth.setdefault("google_accounts", {})[account] = {
         "refresh_token": credentials.refresh_token,
         "token": credentials.token,
         "client_id": credentials.client_id,
         "client_secret": credentials.client_secret,
         "token_uri": credentials.token_uri,
+        "expiry": (
+            credentials.expiry.strftime("%Y-%m-%dT%H:%M:%S.%f")
+            if credentials.expiry else None),
     }
 
     return config
 
 
+class GoogleCredentialPool:
+    """Spreads Google API traffic for calendars across saved accounts.
+
+    Each calendar is assigned to one account and sticks to it between runs so
+    the load stays balanced. Accounts that Google reports as rate limited are
+    benched for a cooldown period and their calendars are moved over to the
+    least busy account that's still available. Pool state is stored in the
+    config so it carries over between runs.
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.state = config.setdefault("credential_pool", {})
+        self.state.setdefault("assignments", {})
+        self.state.setdefault("rate_limited", {})
+        self._prune_state()
+
+        # Credentials are refreshed lazily, once per account per run.
+        self._credentials = {}
+        self._broken_accounts = set()
+
+    def _prune_state(self):
+        """Drops expired cooldowns and assignments to removed accounts."""
+
+        accounts = get_google_accounts(self.config)
+        now = time.time()
+
+        self.state["rate_limited"] = {
+            account: until
+            for account, until in self.state["rate_limited"].items()
+            if account in accounts and until > now
+        }
+        self.state["assignments"] = {
+            calendar: account
+            for calendar, account in self.state["assignments"].items()
+            if account in accounts
+        }
+
+    def accounts(self) -> list:
+        """Returns the names of all saved accounts."""
+
+        return sorted(get_google_accounts(self.config).keys())
+
+    def is_available(self, account: str) -> bool:
+        """Checks if an account can currently be used to make requests."""
+
+        if account in self._broken_accounts:
+            return False
+        if account not in get_google_accounts(self.config):
+            return False
+
+        return self.state["rate_limited"].get(account, 0) <= time.time()
+
+    def assign(self, calendar: str) -> str:
+        """Returns the account a calendar's requests should be made with.
+
+        None is returned if no account is currently available.
+        """
+
+        assignments = self.state["assignments"]
+
+        account = assignments.get(calendar)
+        if account and self.is_available(account):
+            return account
+
+        available = [a for a in self.accounts() if self.is_available(a)]
+        if not available:
+            return None
+
+        # Pick the account serving the fewest calendars to balance the load.
+        loads = {a: 0 for a in available}
+        for assigned in assignments.values():
+            if assigned in loads:
+                loads[assigned] += 1
+        account = min(available, key=lambda a: (loads[a], a))
+
+        assignments[calendar] = account
+
+        return account
+
+    def get_credentials(self, account: str) -> Credentials:
+        """Returns refreshed credentials for an account.
+
+        Accounts whose credentials can't be loaded aren't handed out again for
+        the rest of the run.
+        """
+
+        if account not in self._credentials:
+            try:
+                credentials = get_saved_google_credentials(
+                    self.config, account)
+            except RefreshError as error:
+                LOG.warning(
+                    "Unable to refresh Google account '%s': %s",
+                    account, error)
+                credentials = None
+
+            if not credentials:
+                self.mark_broken(account)
+            self._credentials[account] = credentials
+
+        return self._credentials[account]
+
+    def mark_broken(self, account: str):
+        """Takes an account out of rotation for the rest of the run."""
+
+        LOG.warning("Google account '%s' is not usable.", account)
+        self._broken_accounts.add(account)
+
+    def mark_rate_limited(self, account: str):
+        """Benches an account after Google reports it as rate limited."""
+
+        LOG.warning(
+            "Google account '%s' is rate limited, moving its calendars to "
+            "other accounts.", account)
+        self.state["rate_limited"][account] = time.time() + RATE_LIMIT_COOLDOWN
+
+
 def setup_config_dir():
     """Makes sure the config directory exists."""
 
@@ -145,7 +316,7 @@ def get_config() -> dict:
     else:
         config = {}
 
-    return config
+    return migrate_legacy_google_credentials(config)
 
 
 def save_config(config: dict):
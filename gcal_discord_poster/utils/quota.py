@@ -0,0 +1,175 @@
+# MIT License
+#
+# Copyright (c) 2019 Walter Kuppens
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Contains helpers for keeping Google API usage within a daily budget."""
+
+import datetime
+import logging
+import time
+
+# Quota units charged by Google for each API method we call.
+METHOD_COSTS = {
+    "events.list": 1,
+}
+
+LOG = logging.getLogger("gcal-discord-poster")
+
+
+def pacific_utc_offset(dt: datetime.datetime) -> datetime.timedelta:
+    """Returns the US Pacific UTC offset in effect at a naive UTC datetime.
+
+    Daylight saving time starts on the second Sunday of March and ends on the
+    first Sunday of November, both at 2am local time.
+    """
+
+    march_first = datetime.datetime(dt.year, 3, 1)
+    november_first = datetime.datetime(dt.year, 11, 1)
+    dst_start = march_first + datetime.timedelta(
+        days=(6 - march_first.weekday()) % 7 + 7, hours=10)
+    dst_end = november_first + datetime.timedelta(
+        days=(6 - november_first.weekday()) % 7, hours=9)
+
+    if dst_start <= dt < dst_end:
+        return datetime.timedelta(hours=-7)
+    return datetime.timedelta(hours=-8)
+
+
+def quota_now() -> datetime.datetime:
+    """Returns the current time in US Pacific time, where quotas reset."""
+
+    now = datetime.datetime.utcnow()
+    return now + pacific_utc_offset(now)
+
+
+def seconds_left_today() -> float:
+    """Returns the number of seconds until the daily quota resets."""
+
+    now = datetime.datetime.utcnow()
+    midnight = datetime.datetime.combine(
+        quota_now().date() + datetime.timedelta(days=1), datetime.time())
+
+    # The offset at midnight may differ from the current one if daylight
+    # saving time starts or ends today.
+    reset = midnight - pacific_utc_offset(now)
+    reset = midnight - pacific_utc_offset(reset)
+
+    return (reset - now).total_seconds()
+
+
+class RequestAccountant:
+    """Counts Google API calls and quota units spent per calendar.
+
+    Counters are stored in the config so they add up across runs, and are
+    reset at midnight US Pacific time, when Google's daily quotas reset. If
+    a daily budget is set, the accountant spaces out polls so the remaining
+    budget lasts the rest of the day, giving calendars with upcoming events
+    more frequent polls. Google charges per request regardless of the
+    fields or page size asked for, so spacing out polls is the only lever.
+    """
+
+    def __init__(self, config: dict, daily_budget=None):
+        self.daily_budget = daily_budget
+        self.state = config.setdefault("request_accounting", {})
+        self.state.setdefault("calls", {})
+        self.state.setdefault("units", {})
+        self.state.setdefault("last_polled", {})
+        self.state.setdefault("upcoming_events", {})
+
+        today = quota_now().date().isoformat()
+        if self.state.get("day") != today:
+            self.state["day"] = today
+            self.state["calls"] = {}
+            self.state["units"] = {}
+            self.state["last_polled"] = {}
+            self.state["upcoming_events"] = {}
+
+    def units_spent(self) -> int:
+        """Returns the quota units spent today across all calendars."""
+
+        return sum(self.state["units"].values())
+
+    def remaining(self) -> int:
+        """Returns the quota units left today, or None if unbudgeted."""
+
+        if self.daily_budget is None:
+            return None
+
+        return max(self.daily_budget - self.units_spent(), 0)
+
+    def poll_interval(self, calendar: str) -> float:
+        """Returns the minimum number of seconds between polls of a calendar.
+
+        The remaining budget is spread evenly over the rest of the day and
+        across every calendar polled today. Calendars that had upcoming
+        events on their last poll are allowed to be polled twice as often.
+        """
+
+        remaining = self.remaining()
+        if remaining is None:
+            return 0
+        if remaining == 0:
+            return seconds_left_today()
+
+        calendars = set(self.state["last_polled"].keys()) | {calendar}
+        interval = seconds_left_today() * len(calendars) / remaining
+
+        if self.state["upcoming_events"].get(calendar, 0) > 0:
+            interval /= 2
+
+        return interval
+
+    def should_poll(self, calendar: str) -> bool:
+        """Checks if a calendar can be polled within the daily budget."""
+
+        remaining = self.remaining()
+        if remaining is None:
+            return True
+        if remaining < METHOD_COSTS["events.list"]:
+            return False
+
+        last_polled = self.state["last_polled"].get(calendar, 0)
+        return time.time() - last_polled >= self.poll_interval(calendar)
+
+    def execute(self, calendar: str, method: str, request) -> dict:
+        """Executes a Google API request and records what it cost.
+
+        The request is counted before it's sent, as Google charges for failed
+        requests too.
+        """
+
+        calls = self.state["calls"]
+        units = self.state["units"]
+        calls[calendar] = calls.get(calendar, 0) + 1
+        units[calendar] = units.get(calendar, 0) + METHOD_COSTS[method]
+        self.state["last_polled"][calendar] = time.time()
+
+        LOG.debug(
+            "Calling %s on '%s' (%d calls, %d units today).",
+            method, calendar, calls[calendar], units[calendar])
+
+        response = request.execute()
+
+        if method == "events.list":
+            self.state["upcoming_events"][calendar] = len(
+                response.get("items", []))
+
+        return response